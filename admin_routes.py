@@ -5,11 +5,13 @@ from werkzeug.utils import secure_filename
 from openpyxl.styles import Font
 import openpyxl
 from datetime import datetime
+from question_import import import_document
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'pdf', 'docx'}
+DOCUMENT_EXTENSIONS = {'pdf', 'docx'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -63,7 +65,7 @@ def upload_questions(exam_id):
             return redirect(request.url)
 
         if not allowed_file(file.filename):
-            flash('Only Excel files (.xlsx, .xls) are allowed!', 'error')
+            flash('Only Excel (.xlsx, .xls), PDF (.pdf) or Word (.docx) files are allowed!', 'error')
             return redirect(request.url)
 
         filename = secure_filename(file.filename)
@@ -71,6 +73,28 @@ def upload_questions(exam_id):
         file.save(filepath)
 
         try:
+            if filename.rsplit('.', 1)[1].lower() in DOCUMENT_EXTENSIONS:
+                conn = get_db()
+                try:
+                    count, skipped, partial = import_document(conn, exam_id, filepath)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    conn.close()
+
+                os.remove(filepath)
+                if not count:
+                    flash(f'No questions could be read from the document ({skipped} blocks skipped).', 'error')
+                    return redirect(request.url)
+                flash(f'{count} questions successfully uploaded!', 'success')
+                if skipped or partial:
+                    flash(f'{skipped} blocks were skipped (no options found) and {partial} questions '
+                          f'are incomplete (missing options or answer, defaulted to A). Please review them.',
+                          'warning')
+                return redirect(url_for('admin.view_results', exam_id=exam_id))
+
             wb = openpyxl.load_workbook(filepath)
             sheet = wb.active
             questions = []
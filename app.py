@@ -6,11 +6,50 @@ import sqlite3
 from datetime import datetime
 import json     
 import secrets
+import time
 from admin_routes import admin_bp
 from student_routes import student_bp
+import shared_state
+from database import ensure_attempt_deadlines
+from exam_scheduler import scheduler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "exam_system.db")
+SECRET_PATH = os.path.join(BASE_DIR, ".session_secret")
+
+LOGIN_ATTEMPT_LIMIT = 10
+LOGIN_ATTEMPT_WINDOW = 300
+
+
+def load_secret_key():
+    """Return a secret key that is identical in every worker process.
+
+    SESSION_SECRET wins when set; otherwise the first process to start writes
+    a random key to SECRET_PATH and the others read it back.
+    """
+    secret = os.environ.get('SESSION_SECRET')
+    if secret:
+        return secret
+    try:
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+    except FileExistsError:
+        pass
+    for _ in range(50):
+        with open(SECRET_PATH) as f:
+            secret = f.read().strip()
+        if secret:
+            return secret
+        time.sleep(0.01)
+    raise RuntimeError(f'Empty session secret in {SECRET_PATH}')
+
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SESSION_SECRET', secrets.token_hex(32))
+app.config['SECRET_KEY'] = load_secret_key()
+app.config['SESSION_COOKIE_HTTPONLY'] = True
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+app.config['SESSION_COOKIE_SECURE'] = os.environ.get('SESSION_COOKIE_SECURE', '0') == '1'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 CORS(app)
@@ -19,19 +58,24 @@ app.register_blueprint(admin_bp)
 app.register_blueprint(student_bp)
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True) 
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "exam_system.db")
+shared_state.init_shared_state()
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     return conn
 
+_conn = get_db()
+ensure_attempt_deadlines(_conn)
+_conn.close()
+
 
 def hash_password(password):
     return generate_password_hash(password)
 
+def login_attempt_key(role, username):
+    return f'login:{role}:{request.remote_addr}:{username}'
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -41,6 +85,12 @@ def admin_login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        attempt_key = login_attempt_key('admin', username)
+
+        # Count the attempt before checking the password so concurrent guesses can't all slip through.
+        if shared_state.incr(attempt_key, ttl=LOGIN_ATTEMPT_WINDOW) > LOGIN_ATTEMPT_LIMIT:
+            flash('Too many failed login attempts. Please try again later.', 'error')
+            return render_template('admin_login.html')
         
         conn = get_db()
         admin = conn.execute('SELECT * FROM users WHERE username = ? AND role = "admin"', 
@@ -51,6 +101,7 @@ def admin_login():
             session['user_id'] = admin['id']
             session['username'] = admin['username']
             session['role'] = 'admin'
+            shared_state.reset_counter(attempt_key)
             return redirect(url_for('admin_dashboard'))
         else:
             flash('Invalid credentials', 'error')
@@ -62,6 +113,12 @@ def student_login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        attempt_key = login_attempt_key('student', username)
+
+        # Count the attempt before checking the password so concurrent guesses can't all slip through.
+        if shared_state.incr(attempt_key, ttl=LOGIN_ATTEMPT_WINDOW) > LOGIN_ATTEMPT_LIMIT:
+            flash('Too many failed login attempts. Please try again later.', 'error')
+            return render_template('student_login.html')
         
         conn = get_db()
         student = conn.execute('SELECT * FROM users WHERE username = ? AND role = "student"', 
@@ -72,6 +129,7 @@ def student_login():
             session['user_id'] = student['id']
             session['username'] = student['username']
             session['role'] = 'student'
+            shared_state.reset_counter(attempt_key)
             return redirect(url_for('student_dashboard'))
         else:
             flash('Invalid credentials', 'error')
@@ -121,16 +179,13 @@ def student_dashboard():
 
     conn = get_db()
 
-    exams = conn.execute('SELECT * FROM exams WHERE is_active = 1').fetchall()
-    available_exams = []
-
-    for exam in exams or []:
-        attempt = conn.execute(
-            'SELECT * FROM student_attempts WHERE student_id = ? AND exam_id = ?',
-            (session['user_id'], exam['id'])
-        ).fetchone()
-        if not attempt:
-            available_exams.append(exam)
+    available_exams = conn.execute('''
+        SELECT * FROM exams e
+        WHERE e.is_active = 1 AND NOT EXISTS (
+            SELECT 1 FROM student_attempts sa
+            WHERE sa.student_id = ? AND sa.exam_id = e.id
+        )
+    ''', (session['user_id'],)).fetchall()
 
     completed = conn.execute('''
         SELECT e.title, sa.score, sa.submitted_at 
@@ -183,5 +238,8 @@ def download_db():
     )
 
 if __name__ == "__main__":
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py app:app`.
+    # gunicorn starts the scheduler in each worker from its post_fork hook.
+    scheduler.start()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
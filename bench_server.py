@@ -0,0 +1,124 @@
+"""Throughput of the gunicorn deployment as the worker count grows.
+
+Usage: python bench_server.py [max_workers] [seconds] [client_procs]
+
+Starts `gunicorn -c gunicorn.conf.py app:app` once per worker count from 1 up
+to max_workers (default: CPU count) and drives it for the given number of
+seconds from `client_procs` load processes (default: CPU count), each running
+several keep-alive connections. One request in three is a failed login, which
+writes to the shared-state store. Worker recycling is disabled during the run.
+"""
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+PORT = int(os.environ.get('BENCH_PORT', 5055))
+# (method, path, form body). The failed login goes through the shared-state
+# counter (a BEGIN IMMEDIATE write on shared_state.db) on every request, so
+# the mix shows SQLite write contention between workers, not just templating.
+REQUESTS = [
+    ('GET', '/', None),
+    ('GET', '/student/login', None),
+    ('POST', '/student/login', 'username=bench-{client}&password=wrong'),
+]
+THREADS_PER_PROC = 8
+
+
+def wait_for_server(timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not come up')
+
+
+def client(stop_at, counts, index):
+    conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+    client_id = f'{os.getpid()}-{index}'
+    done = 0
+    while time.time() < stop_at:
+        method, path, body = REQUESTS[done % len(REQUESTS)]
+        headers = {}
+        if body:
+            body = body.format(client=client_id)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+        except (OSError, http.client.HTTPException):
+            # Worker restarts drop keep-alive connections; open a new one.
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', PORT, timeout=10)
+            continue
+        if resp.status == 200:
+            done += 1
+    conn.close()
+    counts[index] = done
+
+
+def load_process(stop_at, queue):
+    counts = [0] * THREADS_PER_PROC
+    threads = [threading.Thread(target=client, args=(stop_at, counts, i))
+               for i in range(THREADS_PER_PROC)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    queue.put(sum(counts))
+
+
+def run(workers, seconds, client_procs):
+    env = dict(os.environ, PORT=str(PORT), WEB_CONCURRENCY=str(workers),
+               GUNICORN_MAX_REQUESTS='0',
+               SESSION_SECRET=os.environ.get('SESSION_SECRET', 'bench'))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', os.devnull, 'app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_server()
+        queue = multiprocessing.Queue()
+        stop_at = time.time() + seconds
+        procs = [multiprocessing.Process(target=load_process, args=(stop_at, queue))
+                 for _ in range(client_procs)]
+        for p in procs:
+            p.start()
+        total = sum(queue.get() for _ in procs)
+        for p in procs:
+            p.join()
+        return total / seconds
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    cpus = multiprocessing.cpu_count()
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else cpus
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    client_procs = int(sys.argv[3]) if len(sys.argv) > 3 else cpus
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    baseline = None
+    print(f'cpus={cpus} client_procs={client_procs} threads_per_proc={THREADS_PER_PROC}')
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    for workers in range(1, max_workers + 1):
+        rps = run(workers, seconds, client_procs)
+        baseline = baseline or rps
+        print(f'{workers:>8} {rps:>10.1f} {rps / baseline:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,38 @@ from werkzeug.security import generate_password_hash
 def hash_password(password):
     return generate_password_hash(password)
 
+def ensure_attempt_deadlines(conn):
+    """Add `student_attempts.deadline_at` (epoch seconds) to older databases.
+
+    The partial index keeps loading the open deadlines at startup proportional
+    to the number of in-progress attempts rather than the whole table.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(student_attempts)')]
+    if not columns:
+        # Fresh database: init_database creates the table with the column.
+        return
+    if 'deadline_at' not in columns:
+        conn.execute('ALTER TABLE student_attempts ADD COLUMN deadline_at REAL')
+        conn.execute('''
+        UPDATE student_attempts
+        SET deadline_at = CAST(strftime('%s', started_at) AS REAL) +
+            60 * (SELECT duration_minutes FROM exams WHERE exams.id = student_attempts.exam_id)
+        WHERE deadline_at IS NULL
+        ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_attempts_open_deadline
+    ON student_attempts (deadline_at) WHERE status = 'in_progress'
+    ''')
+    conn.execute('''
+    CREATE INDEX IF NOT EXISTS idx_attempts_student_exam
+    ON student_attempts (student_id, exam_id)
+    ''')
+    conn.commit()
+
 def init_database():
     conn = sqlite3.connect('exam_system.db')
+    # WAL lets the web workers read while another one is writing.
+    conn.execute('PRAGMA journal_mode=WAL')
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -60,6 +90,7 @@ def init_database():
         status TEXT DEFAULT 'in_progress',
         warnings_count INTEGER DEFAULT 0,
         violation_reason TEXT,
+        deadline_at REAL,
         FOREIGN KEY (student_id) REFERENCES users(id),
         FOREIGN KEY (exam_id) REFERENCES exams(id)
     )
@@ -80,6 +111,8 @@ def init_database():
     )
     ''')
 
+    ensure_attempt_deadlines(conn)
+
     existing_admin = cursor.execute('SELECT * FROM users WHERE username = "admin"').fetchone()
     if not existing_admin:
         cursor.execute(
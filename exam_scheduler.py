@@ -0,0 +1,300 @@
+import heapq
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+
+import shared_state
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "exam_system.db")
+
+# Seconds after the deadline during which answers/submissions are still
+# accepted, to absorb network latency from the browser's own timer.
+GRACE_SECONDS = 5
+BATCH_SIZE = 500
+RETRY_SECONDS = 5
+# After MAX_RETRIES quick retries the delay doubles, up to MAX_RETRY_SECONDS.
+MAX_RETRIES = 5
+MAX_RETRY_SECONDS = 300
+# How often the leader picks up attempts started by other workers.
+POLL_SECONDS = 2
+LEASE_NAME = 'exam-deadlines'
+LEASE_SECONDS = 15
+CLOSED_CACHE_SIZE = 100000
+# How often the leader drops expired entries from the shared-state store.
+PURGE_SECONDS = 600
+
+
+def get_db():
+    conn = sqlite3.connect(DB_PATH, timeout=10, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def grade_answers(answers, questions):
+    score = 0
+    for question in questions:
+        student_answer = answers.get(str(question['id']))
+        if student_answer and str(student_answer).upper() == question['correct_answer'].upper():
+            score += question['marks']
+    return score
+
+
+class DeadlineScheduler:
+    """Closes in-progress attempts once `deadline_at` has passed.
+
+    Every worker process keeps the deadlines it has seen in a min-heap plus
+    `_deadlines`, and remembers recently closed attempts in `_closed`, so
+    late calls are answered from memory. `_due` holds the time each attempt's
+    live heap entry fires - normally deadline + grace, later when a failed
+    finalise is being retried. Cancelled or rescheduled attempts leave stale
+    heap entries behind; they are skipped when popped.
+
+    Only one process - the holder of the `exam-deadlines` lease in the
+    shared-state DB - writes to the database. It loads every open attempt
+    when it takes the lease, polls for attempts started since by primary
+    key, and grades and closes them in batches as they fall due. The other
+    workers simply drop due entries from memory.
+    """
+
+    def __init__(self, db_factory=get_db, grace=GRACE_SECONDS, batch_size=BATCH_SIZE):
+        self.db_factory = db_factory
+        self.grace = grace
+        self.batch_size = batch_size
+        self._heap = []
+        self._deadlines = {}
+        self._due = {}
+        self._closed = OrderedDict()
+        self._retries = {}
+        self._is_leader = False
+        self._last_id = 0
+        self._next_purge = 0
+        self._cond = threading.Condition()
+        self._pid = None
+        self._owner = None
+
+    def start(self):
+        """Start the expiry thread once per process; gunicorn calls this from post_fork."""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            # A forked worker inherits the parent's state but not its thread.
+            self._heap = []
+            self._deadlines = {}
+            self._due = {}
+            self._closed = OrderedDict()
+            self._retries = {}
+            self._is_leader = False
+            self._owner = f'{socket.gethostname()}:{os.getpid()}'
+            thread = threading.Thread(target=self._run, name='exam-deadlines', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _mark_closed(self, attempt_id):
+        self._deadlines.pop(attempt_id, None)
+        self._due.pop(attempt_id, None)
+        self._closed[attempt_id] = True
+        self._closed.move_to_end(attempt_id)
+        if len(self._closed) > CLOSED_CACHE_SIZE:
+            self._closed.popitem(last=False)
+
+    def _push(self, attempt_id, deadline_at):
+        self._deadlines[attempt_id] = deadline_at
+        self._enqueue(attempt_id, deadline_at + self.grace)
+
+    def _enqueue(self, attempt_id, due):
+        self._due[attempt_id] = due
+        heapq.heappush(self._heap, (due, attempt_id))
+        if self._heap[0] == (due, attempt_id):
+            self._cond.notify()
+
+    def _load_open(self, conn, query, params=()):
+        rows = conn.execute(query, params).fetchall()
+        with self._cond:
+            for row in rows:
+                self._closed.pop(row['id'], None)
+                self._push(row['id'], row['deadline_at'])
+                self._last_id = max(self._last_id, row['id'])
+
+    def _refresh(self):
+        """Take or renew the lease; the leader pulls open attempts from the DB."""
+        was_leader = self._is_leader
+        self._is_leader = shared_state.acquire_lease(LEASE_NAME, self._owner, LEASE_SECONDS)
+        if not self._is_leader:
+            return
+
+        if time.time() >= self._next_purge:
+            shared_state.purge_expired()
+            self._next_purge = time.time() + PURGE_SECONDS
+
+        conn = self.db_factory()
+        try:
+            if not was_leader:
+                self._load_open(conn,
+                    "SELECT id, deadline_at FROM student_attempts "
+                    "WHERE status = 'in_progress' AND deadline_at IS NOT NULL")
+            else:
+                self._load_open(conn,
+                    "SELECT id, deadline_at FROM student_attempts "
+                    "WHERE id > ? AND status = 'in_progress' AND deadline_at IS NOT NULL",
+                    (self._last_id,))
+        finally:
+            conn.close()
+
+    def schedule(self, attempt_id, deadline_at):
+        with self._cond:
+            self._closed.pop(attempt_id, None)
+            self._push(attempt_id, deadline_at)
+
+    def cancel(self, attempt_id):
+        with self._cond:
+            self._mark_closed(attempt_id)
+
+    def deadline_for(self, attempt_id):
+        """Deadline of an open attempt, or None if it is closed or unknown.
+
+        Attempts started by another worker are looked up once by primary key;
+        open or closed, the result is remembered so repeat calls stay in memory.
+        """
+        with self._cond:
+            if attempt_id in self._deadlines:
+                return self._deadlines[attempt_id]
+            if attempt_id is None or attempt_id in self._closed:
+                return None
+
+        conn = self.db_factory()
+        row = conn.execute(
+            'SELECT deadline_at, status FROM student_attempts WHERE id = ?', (attempt_id,)
+        ).fetchone()
+        conn.close()
+        if not row or row['status'] != 'in_progress' or row['deadline_at'] is None:
+            with self._cond:
+                self._mark_closed(attempt_id)
+            return None
+        self.schedule(attempt_id, row['deadline_at'])
+        return row['deadline_at']
+
+    def is_expired(self, attempt_id, now=None):
+        deadline = self.deadline_for(attempt_id)
+        if deadline is None:
+            return True
+        return (now or time.time()) > deadline + self.grace
+
+    def _pop_due(self, now):
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            due, attempt_id = heapq.heappop(self._heap)
+            if self._due.get(attempt_id) != due:
+                continue
+            self._mark_closed(attempt_id)
+            batch.append(attempt_id)
+        return batch
+
+    def _run(self):
+        next_refresh = 0
+        while True:
+            now = time.time()
+            if now >= next_refresh:
+                try:
+                    self._refresh()
+                except Exception:
+                    traceback.print_exc()
+                    self._is_leader = False
+                next_refresh = time.time() + POLL_SECONDS
+
+            with self._cond:
+                now = time.time()
+                if not self._heap or self._heap[0][0] > now:
+                    wake_at = min(self._heap[0][0], next_refresh) if self._heap else next_refresh
+                    self._cond.wait(max(wake_at - now, 0))
+                    continue
+                batch = self._pop_due(now)
+
+            if not batch or not self._is_leader:
+                continue
+            try:
+                self.finalise(batch)
+                for attempt_id in batch:
+                    self._retries.pop(attempt_id, None)
+            except Exception:
+                traceback.print_exc()
+                self._retry(batch)
+
+    def _retry(self, batch):
+        """Requeue a batch that failed as a whole (e.g. the DB stayed locked).
+
+        The attempts stay marked closed, so late answers are still rejected;
+        only their heap entry moves. Nothing is ever dropped: after
+        MAX_RETRIES the delay backs off exponentially instead.
+        """
+        now = time.time()
+        with self._cond:
+            for attempt_id in batch:
+                tries = self._retries.get(attempt_id, 0) + 1
+                self._retries[attempt_id] = tries
+                delay = RETRY_SECONDS
+                if tries > MAX_RETRIES:
+                    delay = min(RETRY_SECONDS * 2 ** (tries - MAX_RETRIES), MAX_RETRY_SECONDS)
+                self._enqueue(attempt_id, now + delay)
+
+    def finalise(self, attempt_ids):
+        """Grade and close a batch of expired attempts in one transaction.
+
+        An attempt that cannot be graded is still closed, with score 0, reason
+        'grading_failed' and a GRADING_FAILED log entry, so that one bad row
+        never holds back the rest of the batch.
+        """
+        conn = self.db_factory()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            placeholders = ','.join('?' * len(attempt_ids))
+            attempts = conn.execute(
+                f"SELECT id, exam_id, answers FROM student_attempts "
+                f"WHERE id IN ({placeholders}) AND status = 'in_progress'",
+                attempt_ids
+            ).fetchall()
+
+            questions_by_exam = {}
+            for exam_id in {a['exam_id'] for a in attempts}:
+                questions_by_exam[exam_id] = conn.execute(
+                    'SELECT id, correct_answer, marks FROM questions WHERE exam_id = ?', (exam_id,)
+                ).fetchall()
+
+            submitted_at = datetime.now()
+            updates = []
+            logs = []
+            for attempt in attempts:
+                try:
+                    answers = json.loads(attempt['answers']) if attempt['answers'] else {}
+                    score = grade_answers(answers, questions_by_exam[attempt['exam_id']])
+                except Exception as e:
+                    updates.append((0, submitted_at, 'completed', 'grading_failed', attempt['id']))
+                    logs.append((attempt['id'], 'GRADING_FAILED', f'Reason: time_expired; {e!r}'))
+                    continue
+                updates.append((score, submitted_at, 'completed', 'time_expired', attempt['id']))
+                logs.append((attempt['id'], 'EXAM_SUBMITTED', 'Reason: time_expired'))
+
+            conn.executemany('''UPDATE student_attempts
+                               SET score = ?, submitted_at = ?, status = ?, violation_reason = ?
+                               WHERE id = ?''', updates)
+            conn.executemany('''INSERT INTO monitoring_logs
+                               (attempt_id, event_type, details)
+                               VALUES (?, ?, ?)''', logs)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(updates)
+
+
+scheduler = DeadlineScheduler()
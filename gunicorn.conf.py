@@ -0,0 +1,33 @@
+import multiprocessing
+import os
+
+# Production server settings. Workers are separate processes, so anything that
+# has to be seen by all of them lives in SQLite (exam_system.db, shared_state.db)
+# and the session secret is read from SESSION_SECRET or the shared key file.
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+# Recycle workers periodically; 0 disables it (bench_server.py does).
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = 200 if max_requests else 0
+preload_app = True
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    from database import init_database
+    from shared_state import init_shared_state
+    init_database()
+    init_shared_state()
+
+
+def post_fork(server, worker):
+    # Every worker runs a deadline scheduler from boot, not from its first
+    # request, so expired attempts are closed even when no traffic arrives.
+    from exam_scheduler import scheduler
+    scheduler.start()
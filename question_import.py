@@ -0,0 +1,235 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import shared_state
+
+PAGES_PER_TASK = 20
+INSERT_BATCH_SIZE = 200
+# Bump whenever parse_questions changes, so cached parses of old uploads are not reused.
+PARSER_VERSION = 2
+CACHE_PREFIX = f'question-bank:v{PARSER_VERSION}:'
+CACHE_TTL = 30 * 24 * 3600
+
+# Recognised layout, one item per line (PDF text lines or DOCX paragraphs):
+#
+#   1. Capital of France?          Q1) ... / Question 1: ...
+#   A) London    B) Paris          (a) ... / A. ... ; one or several per line
+#   C) Rome      D) Berlin
+#   Answer: B                      Ans: (b) / Correct Answer - B
+#
+# The question number's delimiter must be followed by a space (or end the
+# line), so wrapped text such as "2.5 micrograms" is not a new question.
+# Options must appear in order; a letter out of sequence is plain text.
+OPTION_LETTERS = 'ABCD'
+QUESTION_RE = re.compile(r'^\s*(?:Q(?:uestion)?\s*)?(\d+)\s*[.):](?:\s+(.*))?$', re.IGNORECASE)
+OPTION_DELIM = r'\s*[).:\]]\s*'
+OPTION_START_RE = re.compile(r'^\s*\(?([A-Da-d])' + OPTION_DELIM)
+ANSWER_RE = re.compile(r'^\s*(?:Correct\s+)?(?:Answer|Ans)\s*[:.\-]?\s*\(?([A-Da-d])\b', re.IGNORECASE)
+ANSWER_WORD_RE = re.compile(r'^\s*(?:Correct\s+)?(?:Answer|Ans)\b', re.IGNORECASE)
+
+INSERT_SQL = '''INSERT INTO questions
+                (exam_id, question_text, option_a, option_b, option_c, option_d, correct_answer)
+                VALUES (?, ?, ?, ?, ?, ?, ?)'''
+
+
+def file_digest(filepath):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_pdf_pages(filepath, start, stop):
+    """Text of pages [start, stop) of a PDF. Runs inside a pool worker."""
+    import pdfplumber
+
+    with pdfplumber.open(filepath) as pdf:
+        return [pdf.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+def iter_pdf_lines(filepath):
+    """Yield PDF text lines in page order, extracting pages across a process pool."""
+    import pdfplumber
+
+    with pdfplumber.open(filepath) as pdf:
+        page_count = len(pdf.pages)
+
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PAGES_PER_TASK)]
+
+    if len(ranges) <= 1:
+        chunks = (extract_pdf_pages(filepath, start, stop) for start, stop in ranges)
+        for pages in chunks:
+            for text in pages:
+                yield from text.splitlines()
+        return
+
+    workers = min(len(ranges), os.cpu_count() or 1)
+    # spawn rather than fork: the web worker already runs background threads.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        chunks = pool.map(extract_pdf_pages,
+                          [filepath] * len(ranges),
+                          [start for start, _ in ranges],
+                          [stop for _, stop in ranges])
+        for pages in chunks:
+            for text in pages:
+                yield from text.splitlines()
+
+
+def iter_docx_lines(filepath):
+    import docx
+
+    document = docx.Document(filepath)
+    for paragraph in document.paragraphs:
+        yield from paragraph.text.splitlines()
+
+
+def split_options(line, first):
+    """Split "A) x  B) y" into [(letter, text)], splitting only at the next expected letter."""
+    options = []
+    letter = first
+    rest = OPTION_START_RE.sub('', line, count=1)
+    while True:
+        index = OPTION_LETTERS.index(letter)
+        following = OPTION_LETTERS[index + 1] if index + 1 < len(OPTION_LETTERS) else None
+        match = None
+        if following:
+            pattern = r'\s\(?[' + following + following.lower() + ']' + OPTION_DELIM
+            match = re.search(pattern, rest)
+        if not match:
+            options.append((letter, rest.strip()))
+            return options
+        options.append((letter, rest[:match.start()].strip()))
+        rest = rest[match.end():]
+        letter = following
+
+
+def parse_questions(lines):
+    """Turn text lines into question records.
+
+    Returns (questions, skipped, partial): `skipped` counts numbered blocks
+    dropped for lacking text or options, `partial` counts kept questions
+    with missing options, no answer line (the answer then defaults to A), or
+    an option letter seen twice - usually option text such as "Plan b: wait"
+    that was mistaken for the next option.
+    """
+    questions = []
+    skipped = 0
+    partial = 0
+    current = None
+    last_field = None
+    last_option = None
+    repeated_option = False
+
+    def finish(question):
+        nonlocal skipped, partial
+        if question is None:
+            return
+        if not question['question_text'] or not question['option_a']:
+            skipped += 1
+            return
+        if repeated_option or not question['correct_answer'] or not all(
+                question['option_' + letter.lower()] for letter in OPTION_LETTERS):
+            partial += 1
+        question['correct_answer'] = question['correct_answer'] or 'A'
+        questions.append(question)
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        answer = ANSWER_RE.match(line)
+        if answer and current:
+            current['correct_answer'] = answer.group(1).upper()
+            last_field = None
+            continue
+        if ANSWER_WORD_RE.match(line):
+            # Instructions such as "Answer all parts" belong to no field.
+            last_field = None
+            continue
+
+        question = QUESTION_RE.match(line)
+        if question:
+            finish(current)
+            current = {
+                'question_text': (question.group(2) or '').strip(),
+                'option_a': '', 'option_b': '', 'option_c': '', 'option_d': '',
+                'correct_answer': None
+            }
+            last_field = 'question_text'
+            last_option = None
+            repeated_option = False
+            continue
+
+        if current is None:
+            continue
+
+        option = OPTION_START_RE.match(line)
+        if option:
+            letter = option.group(1).upper()
+            expected = OPTION_LETTERS[OPTION_LETTERS.index(last_option) + 1] if last_option else 'A'
+            if last_option != 'D' and letter == expected:
+                for letter, text in split_options(line, letter):
+                    last_field = 'option_' + letter.lower()
+                    current[last_field] = text
+                    last_option = letter
+                continue
+            if current['option_' + letter.lower()]:
+                repeated_option = True
+
+        if last_field:
+            current[last_field] = f"{current[last_field]} {line}".strip()
+
+    finish(current)
+    return questions, skipped, partial
+
+
+def insert_questions(conn, exam_id, questions, batch_size=INSERT_BATCH_SIZE):
+    """Insert question records in executemany batches; returns the count."""
+    count = 0
+    batch = []
+    for q in questions:
+        batch.append((exam_id, q['question_text'], q['option_a'], q['option_b'],
+                      q['option_c'], q['option_d'], q['correct_answer']))
+        if len(batch) >= batch_size:
+            conn.executemany(INSERT_SQL, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(INSERT_SQL, batch)
+        count += len(batch)
+    return count
+
+
+def import_document(conn, exam_id, filepath):
+    """Parse a PDF or DOCX question bank into `questions` for an exam.
+
+    The whole document is parsed before anything is written, so the write
+    transaction only spans the batched inserts and never the extraction.
+    Parsed records are cached under the file's SHA-256, so uploading the same
+    document again (for this or another exam) skips extraction entirely.
+    Returns (inserted, skipped, partial); the caller commits.
+    """
+    digest = file_digest(filepath)
+    cached = shared_state.cache_get(CACHE_PREFIX + digest)
+    if cached is not None:
+        result = json.loads(cached)
+        questions, skipped, partial = result['questions'], result['skipped'], result['partial']
+    else:
+        if filepath.lower().endswith('.pdf'):
+            lines = iter_pdf_lines(filepath)
+        else:
+            lines = iter_docx_lines(filepath)
+        questions, skipped, partial = parse_questions(lines)
+        if questions:
+            shared_state.cache_set(CACHE_PREFIX + digest, json.dumps(
+                {'questions': questions, 'skipped': skipped, 'partial': partial}), ttl=CACHE_TTL)
+
+    return insert_questions(conn, exam_id, questions), skipped, partial
@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.environ.get('SHARED_STATE_PATH', os.path.join(BASE_DIR, 'shared_state.db'))
+
+
+def get_state_db():
+    """Connection to the SQLite store shared by every worker process."""
+    conn = sqlite3.connect(STATE_PATH, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def init_shared_state():
+    conn = get_state_db()
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS kv_cache (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        expires_at REAL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS counters (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0,
+        expires_at REAL
+    )
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS leases (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''')
+    conn.close()
+
+
+def cache_get(key):
+    conn = get_state_db()
+    row = conn.execute('SELECT value, expires_at FROM kv_cache WHERE key = ?', (key,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+    if row[1] is not None and row[1] < time.time():
+        return None
+    return row[0]
+
+
+def cache_set(key, value, ttl=None):
+    expires_at = time.time() + ttl if ttl else None
+    conn = get_state_db()
+    conn.execute('INSERT OR REPLACE INTO kv_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                 (key, value, expires_at))
+    conn.close()
+
+
+def incr(key, amount=1, ttl=None):
+    """Atomically add `amount` to a counter and return the new value.
+
+    A counter whose `ttl` window has elapsed restarts from zero, which makes
+    this usable as a fixed-window rate limiter.
+    """
+    now = time.time()
+    expires_at = now + ttl if ttl else None
+    conn = get_state_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT value, expires_at FROM counters WHERE key = ?', (key,)).fetchone()
+        if row and (row[1] is None or row[1] >= now):
+            value = row[0] + amount
+            conn.execute('UPDATE counters SET value = ? WHERE key = ?', (value, key))
+        else:
+            value = amount
+            conn.execute('INSERT OR REPLACE INTO counters (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, value, expires_at))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return value
+
+
+def reset_counter(key):
+    conn = get_state_db()
+    conn.execute('DELETE FROM counters WHERE key = ?', (key,))
+    conn.close()
+
+
+def acquire_lease(name, owner, ttl):
+    """Take or renew the lease `name` for `owner`; True if `owner` now holds it.
+
+    Used to elect a single worker for background jobs: a lease that is not
+    renewed within `ttl` seconds can be taken over by another process.
+    """
+    now = time.time()
+    conn = get_state_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        row = conn.execute('SELECT owner, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+        if row and row[0] != owner and row[1] >= now:
+            conn.execute('COMMIT')
+            return False
+        conn.execute('INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)',
+                     (name, owner, now + ttl))
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return True
+
+
+def purge_expired():
+    """Drop expired cache entries and counters; run periodically by one worker."""
+    now = time.time()
+    conn = get_state_db()
+    conn.execute('DELETE FROM kv_cache WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+    conn.execute('DELETE FROM counters WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+    conn.close()
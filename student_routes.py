@@ -2,7 +2,9 @@ from flask import Blueprint, render_template, request, jsonify, session, redirec
 import sqlite3
 import json
 import random
+import time
 from datetime import datetime
+from exam_scheduler import scheduler, grade_answers
 
 student_bp = Blueprint('student', __name__, url_prefix='/student')
 
@@ -32,12 +34,14 @@ def start_exam(exam_id):
         conn.close()
         return "No questions available for this exam", 400
     
-    cursor = conn.execute('INSERT INTO student_attempts (student_id, exam_id, total_marks, status) VALUES (?, ?, ?, ?)',
-                         (session['user_id'], exam_id, len(questions), 'in_progress'))
+    deadline_at = time.time() + exam['duration_minutes'] * 60
+    cursor = conn.execute('INSERT INTO student_attempts (student_id, exam_id, total_marks, status, deadline_at) VALUES (?, ?, ?, ?, ?)',
+                         (session['user_id'], exam_id, len(questions), 'in_progress', deadline_at))
     attempt_id = cursor.lastrowid
     conn.commit()
     conn.close()
     
+    scheduler.schedule(attempt_id, deadline_at)
     session['attempt_id'] = attempt_id
     session['exam_id'] = exam_id
     
@@ -52,17 +56,29 @@ def submit_answer():
     question_id = data.get('question_id')
     answer = data.get('answer')
     attempt_id = session.get('attempt_id')
+
+    if not isinstance(answer, str):
+        return jsonify({'error': 'Invalid answer'}), 400
+
+    if scheduler.is_expired(attempt_id):
+        return jsonify({'error': 'Time is up for this exam'}), 409
     
     conn = get_db()
+    # Lock before reading so concurrent answers for one attempt don't overwrite each other.
+    conn.execute('BEGIN IMMEDIATE')
     attempt = conn.execute('SELECT answers FROM student_attempts WHERE id = ?', (attempt_id,)).fetchone()
     
     answers = json.loads(attempt['answers']) if attempt['answers'] else {}
     answers[str(question_id)] = answer
     
-    conn.execute('UPDATE student_attempts SET answers = ? WHERE id = ?',
-                (json.dumps(answers), attempt_id))
+    updated = conn.execute('UPDATE student_attempts SET answers = ? WHERE id = ? AND status = ?',
+                (json.dumps(answers), attempt_id, 'in_progress')).rowcount
     conn.commit()
     conn.close()
+
+    if not updated:
+        scheduler.cancel(attempt_id)
+        return jsonify({'error': 'Time is up for this exam'}), 409
     
     return jsonify({'success': True})
 
@@ -126,30 +142,35 @@ def submit_exam():
     conn = get_db()
     attempt = conn.execute('SELECT * FROM student_attempts WHERE id = ?', (attempt_id,)).fetchone()
     
-    answers = json.loads(attempt['answers']) if attempt['answers'] else {}
     questions = conn.execute('SELECT * FROM questions WHERE exam_id = ?', 
                             (attempt['exam_id'],)).fetchall()
-    
-    score = 0
-    for question in questions:
-        student_answer = answers.get(str(question['id']))
-        if student_answer and student_answer.upper() == question['correct_answer'].upper():
-            score += question['marks']
+
+    if attempt['status'] != 'in_progress':
+        # Already closed, e.g. by the deadline scheduler after the timer ran out.
+        conn.close()
+        session.pop('attempt_id', None)
+        session.pop('exam_id', None)
+        return jsonify({'success': True, 'score': attempt['score'], 'total': len(questions)})
+
+    answers = json.loads(attempt['answers']) if attempt['answers'] else {}
+    score = grade_answers(answers, questions)
     
     status = 'terminated' if reason == 'violations' else 'completed'
     
-    conn.execute('''UPDATE student_attempts 
+    updated = conn.execute('''UPDATE student_attempts 
                    SET score = ?, submitted_at = ?, status = ?, violation_reason = ?
-                   WHERE id = ?''',
-                (score, datetime.now(), status, reason, attempt_id))
+                   WHERE id = ? AND status = ?''',
+                (score, datetime.now(), status, reason, attempt_id, 'in_progress')).rowcount
     
-    conn.execute('''INSERT INTO monitoring_logs 
-                   (attempt_id, event_type, details)
-                   VALUES (?, ?, ?)''',
-                (attempt_id, 'EXAM_SUBMITTED', f'Reason: {reason}'))
+    if updated:
+        conn.execute('''INSERT INTO monitoring_logs 
+                       (attempt_id, event_type, details)
+                       VALUES (?, ?, ?)''',
+                    (attempt_id, 'EXAM_SUBMITTED', f'Reason: {reason}'))
     
     conn.commit()
     conn.close()
+    scheduler.cancel(attempt_id)
     
     session.pop('attempt_id', None)
     session.pop('exam_id', None)
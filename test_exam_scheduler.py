@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+import exam_scheduler
+import shared_state
+from database import init_database
+from exam_scheduler import DeadlineScheduler
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(shared_state, 'STATE_PATH', str(tmp_path / 'shared_state.db'))
+    init_database()
+    shared_state.init_shared_state()
+
+    def factory():
+        conn = sqlite3.connect(str(tmp_path / 'exam_system.db'), timeout=10, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    return factory
+
+
+def make_exam(factory):
+    conn = factory()
+    exam_id = conn.execute("INSERT INTO exams (title, duration_minutes) VALUES ('t', 10)").lastrowid
+    question_id = conn.execute(
+        "INSERT INTO questions (exam_id, question_text, option_a, correct_answer) VALUES (?, 'q', 'x', 'B')",
+        (exam_id,)
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    return exam_id, question_id
+
+
+def make_attempt(factory, exam_id, deadline_at, answers='{}'):
+    conn = factory()
+    attempt_id = conn.execute(
+        "INSERT INTO student_attempts (student_id, exam_id, total_marks, status, deadline_at, answers) "
+        "VALUES (1, ?, 1, 'in_progress', ?, ?)",
+        (exam_id, deadline_at, answers)
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    return attempt_id
+
+
+def fetch(factory, attempt_id):
+    conn = factory()
+    row = conn.execute('SELECT status, score, violation_reason FROM student_attempts WHERE id = ?',
+                       (attempt_id,)).fetchone()
+    conn.close()
+    return tuple(row)
+
+
+def no_db():
+    raise AssertionError('unexpected database access')
+
+
+def test_finalise_closes_every_row_even_if_one_cannot_be_graded(db):
+    exam_id, question_id = make_exam(db)
+    right = make_attempt(db, exam_id, 0, json.dumps({str(question_id): 'b'}))
+    numeric = make_attempt(db, exam_id, 0, json.dumps({str(question_id): 1}))
+    broken = make_attempt(db, exam_id, 0, 'not json')
+
+    assert DeadlineScheduler(db_factory=db).finalise([right, numeric, broken]) == 3
+
+    assert fetch(db, right) == ('completed', 1, 'time_expired')
+    assert fetch(db, numeric) == ('completed', 0, 'time_expired')
+    assert fetch(db, broken) == ('completed', 0, 'grading_failed')
+
+
+def test_finalise_skips_attempts_already_submitted(db):
+    exam_id, _ = make_exam(db)
+    attempt = make_attempt(db, exam_id, 0)
+    scheduler = DeadlineScheduler(db_factory=db)
+    assert scheduler.finalise([attempt]) == 1
+    assert scheduler.finalise([attempt]) == 0
+
+
+def test_deadline_for_remembers_open_and_closed_attempts(db):
+    exam_id, _ = make_exam(db)
+    deadline = time.time() + 60
+    open_attempt = make_attempt(db, exam_id, deadline)
+    closed_attempt = make_attempt(db, exam_id, 0)
+    DeadlineScheduler(db_factory=db).finalise([closed_attempt])
+
+    scheduler = DeadlineScheduler(db_factory=db)
+    assert scheduler.deadline_for(open_attempt) == deadline
+    assert scheduler.is_expired(closed_attempt)
+
+    scheduler.db_factory = no_db
+    assert not scheduler.is_expired(open_attempt)
+    assert scheduler.is_expired(closed_attempt)
+    assert scheduler.is_expired(None)
+
+
+def test_stale_heap_entries_are_skipped():
+    scheduler = DeadlineScheduler(db_factory=no_db, grace=0)
+    now = time.time()
+    scheduler.schedule(1, now - 20)
+    scheduler.schedule(1, now - 10)
+    scheduler.schedule(2, now - 5)
+    scheduler.cancel(2)
+
+    assert scheduler._pop_due(now) == [1]
+    assert scheduler._heap == []
+
+
+def test_failed_finalise_keeps_attempt_expired_and_never_drops_it(monkeypatch):
+    scheduler = DeadlineScheduler(db_factory=no_db, grace=0)
+    now = time.time()
+    monkeypatch.setattr(exam_scheduler.time, 'time', lambda: now)
+    scheduler.schedule(1, now - 1)
+    batch = scheduler._pop_due(now)
+    assert batch == [1]
+
+    delays = []
+    for _ in range(exam_scheduler.MAX_RETRIES + 10):
+        scheduler._retry(batch)
+        assert scheduler.is_expired(1)
+        delays.append(scheduler._due[1] - now)
+    assert delays[0] == exam_scheduler.RETRY_SECONDS
+    assert delays[exam_scheduler.MAX_RETRIES] > exam_scheduler.RETRY_SECONDS
+    assert delays[-1] == exam_scheduler.MAX_RETRY_SECONDS
+
+    # The latest retry entry is still live; earlier ones are stale.
+    assert scheduler._pop_due(now + exam_scheduler.MAX_RETRY_SECONDS) == [1]
+
+
+def test_only_the_lease_holder_loads_and_polls_attempts(db):
+    exam_id, _ = make_exam(db)
+    first = make_attempt(db, exam_id, time.time() + 60)
+
+    leader = DeadlineScheduler(db_factory=db)
+    leader._owner = 'worker-a'
+    follower = DeadlineScheduler(db_factory=db)
+    follower._owner = 'worker-b'
+
+    leader._refresh()
+    follower._refresh()
+    assert leader._is_leader and not follower._is_leader
+    assert first in leader._deadlines
+    assert follower._deadlines == {}
+
+    second = make_attempt(db, exam_id, time.time() + 60)
+    leader._refresh()
+    assert second in leader._deadlines
+
+    # An expired lease is taken over, and the new leader loads everything.
+    conn = shared_state.get_state_db()
+    conn.execute('UPDATE leases SET expires_at = 0')
+    conn.close()
+    follower._refresh()
+    assert follower._is_leader
+    assert {first, second} <= set(follower._deadlines)
@@ -0,0 +1,219 @@
+import sqlite3
+import sys
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+import question_import
+import shared_state
+from question_import import import_document, insert_questions, iter_pdf_lines, parse_questions
+
+
+def parse(text):
+    return parse_questions(text.strip().splitlines())
+
+
+def test_one_option_per_line():
+    questions, skipped, partial = parse('''
+1. Capital of France?
+A) London
+B) Paris
+C) Rome
+D) Berlin
+Answer: B
+''')
+    assert questions == [{
+        'question_text': 'Capital of France?',
+        'option_a': 'London', 'option_b': 'Paris', 'option_c': 'Rome', 'option_d': 'Berlin',
+        'correct_answer': 'B'
+    }]
+    assert (skipped, partial) == (0, 0)
+
+
+def test_inline_options_and_wrapped_text():
+    questions, skipped, partial = parse('''
+Q2) Which of these is a
+prime number?
+(a) 4   (b) 6
+(c) 7 which is
+odd
+(d) 8
+Ans: (c)
+''')
+    q = questions[0]
+    assert q['question_text'] == 'Which of these is a prime number?'
+    assert [q['option_a'], q['option_b'], q['option_c'], q['option_d']] == ['4', '6', '7 which is odd', '8']
+    assert q['correct_answer'] == 'C'
+    assert (skipped, partial) == (0, 0)
+
+
+def test_option_without_space_after_delimiter():
+    questions, _, _ = parse('''
+1. Value of pi?
+A)3.14 B)2.71
+C)1.41 D)1.73
+Answer: A
+''')
+    assert [questions[0]['option_' + x] for x in 'abcd'] == ['3.14', '2.71', '1.41', '1.73']
+
+
+def test_decimal_at_line_start_is_not_a_question():
+    questions, skipped, _ = parse('''
+1. What is the adult daily dose of
+2.5 micrograms per kg compared with?
+A) 1 mg
+B) 2 mg
+C) 3 mg
+D) 4 mg
+Answer: D
+''')
+    assert len(questions) == 1
+    assert questions[0]['question_text'] == 'What is the adult daily dose of 2.5 micrograms per kg compared with?'
+    assert skipped == 0
+
+
+def test_only_next_letter_splits_inline_options():
+    questions, _, _ = parse('''
+1. Which vitamin is made in skin?
+A) Vitamin D. Also called calciferol
+B) Vitamin C
+C) Vitamin B12
+D) Vitamin K
+Answer: A
+''')
+    q = questions[0]
+    assert q['option_a'] == 'Vitamin D. Also called calciferol'
+    assert q['option_d'] == 'Vitamin K'
+
+
+def test_answer_instructions_are_not_option_text():
+    questions, _, partial = parse('''
+1. Largest planet?
+A) Earth
+B) Jupiter
+C) Mars
+D) Venus
+Answer all parts of section B.
+''')
+    assert questions[0]['option_d'] == 'Venus'
+    assert questions[0]['correct_answer'] == 'A'
+    assert partial == 1
+
+
+def test_reports_skipped_and_partial_blocks():
+    questions, skipped, partial = parse('''
+1. A question with no options
+2. Two options only
+A) yes
+B) no
+Answer: B
+3. No answer line
+A) w
+B) x
+C) y
+D) z
+''')
+    assert [q['question_text'] for q in questions] == ['Two options only', 'No answer line']
+    assert skipped == 1
+    assert partial == 2
+
+
+def test_option_text_that_looks_like_the_next_option_is_reported():
+    questions, _, partial = parse('''
+1. What should you do?
+A) Plan b: wait
+B) Run
+C) Hide
+D) Call
+Answer: B
+''')
+    assert len(questions) == 1
+    assert partial == 1
+
+
+def make_questions_table():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('''CREATE TABLE questions (id INTEGER PRIMARY KEY AUTOINCREMENT, exam_id INTEGER,
+                    question_text TEXT, option_a TEXT, option_b TEXT, option_c TEXT, option_d TEXT,
+                    correct_answer TEXT, marks INTEGER DEFAULT 1)''')
+    return conn
+
+
+BANK = '''
+1. First?
+A) a1
+B) b1
+C) c1
+D) d1
+Answer: A
+2. Second?
+A) a2   B) b2   C) c2   D) d2
+Answer: C
+3. Third?
+A) a3
+'''
+
+
+def test_import_document_inserts_in_order_and_caches_by_content(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_state, 'STATE_PATH', str(tmp_path / 'shared_state.db'))
+    shared_state.init_shared_state()
+    path = tmp_path / 'bank.docx'
+    path.write_bytes(b'same bytes')
+    monkeypatch.setattr(question_import, 'iter_docx_lines', lambda p: iter(BANK.splitlines()))
+    conn = make_questions_table()
+
+    assert import_document(conn, 1, str(path)) == (3, 0, 1)
+
+    def must_not_parse(p):
+        raise AssertionError('cache miss')
+    monkeypatch.setattr(question_import, 'iter_docx_lines', must_not_parse)
+    assert import_document(conn, 2, str(path)) == (3, 0, 1)
+
+    rows = conn.execute('SELECT exam_id, question_text, option_c, correct_answer FROM questions ORDER BY id').fetchall()
+    expected = [('First?', 'c1', 'A'), ('Second?', 'c2', 'C'), ('Third?', '', 'A')]
+    assert rows == [(1,) + r for r in expected] + [(2,) + r for r in expected]
+
+
+def test_insert_questions_uses_batches():
+    class Recorder:
+        def __init__(self):
+            self.batches = []
+
+        def executemany(self, sql, rows):
+            self.batches.append(len(rows))
+
+    questions, _, _ = parse(BANK)
+    conn = Recorder()
+    assert insert_questions(conn, 1, questions, batch_size=2) == 3
+    assert conn.batches == [2, 1]
+
+
+def test_pdf_chunks_are_read_back_in_page_order(monkeypatch):
+    pages = [f'{n + 1}. Question {n + 1}?\nA) x\nAnswer: A' for n in range(7)]
+
+    class Page:
+        def __init__(self, index):
+            self.index = index
+
+        def extract_text(self):
+            # Later pages finish first, so out-of-order results would show.
+            time.sleep(0.01 * (len(pages) - self.index))
+            return pages[self.index]
+
+    class Pdf:
+        def __init__(self):
+            self.pages = [Page(i) for i in range(len(pages))]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setitem(sys.modules, 'pdfplumber', types.SimpleNamespace(open=lambda path: Pdf()))
+    monkeypatch.setattr(question_import, 'PAGES_PER_TASK', 2)
+    monkeypatch.setattr(question_import, 'ProcessPoolExecutor',
+                        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers=4))
+
+    questions, _, _ = parse_questions(iter_pdf_lines('bank.pdf'))
+    assert [q['question_text'] for q in questions] == [f'Question {n + 1}?' for n in range(7)]